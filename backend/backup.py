@@ -0,0 +1,134 @@
+"""
+Online backups and the read-only snapshot.
+
+Both use SQLite's backup API. In WAL mode the whole database is copied in
+a single step: that step only holds a read transaction, which never blocks
+writers, and it cannot be restarted by concurrent writes. Rollback-journal
+databases are copied a few pages at a time instead, which bounds how long
+each read lock blocks writers; since any write restarts a paged backup from
+the first page, restarts are capped by BACKUP_MAX_RESTARTS. Copies are
+written to a temporary file and moved into place, so readers never see a
+half-written file.
+
+Run a backup from the project root with: python -m backend.backup [dest]
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BackupRestartLimitError(RuntimeError):
+    """A paged backup kept restarting because of concurrent writes"""
+
+
+def _paged_backup(source: sqlite3.Connection, target: sqlite3.Connection):
+    """Copy a rollback-journal database in steps, giving up after too many restarts"""
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # Every completed step lowers the remaining page count. A step that
+        # did not (the count went back up, or stayed at the total under
+        # steady writes) means a write restarted the backup.
+        if last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts > settings.backup_max_restarts:
+                raise BackupRestartLimitError(
+                    f"Backup made no progress for {restarts} steps due to concurrent writes"
+                )
+        last_remaining = remaining
+
+    source.backup(
+        target,
+        pages=settings.backup_pages_per_step,
+        progress=progress,
+        sleep=settings.backup_step_sleep_seconds
+    )
+
+
+def _copy_database(dest_path: str) -> int:
+    """Copy the primary database to dest_path and return the page count"""
+    # A unique file next to the destination, so concurrent backups do not
+    # share it and os.replace stays on one filesystem
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(dest_path) or ".",
+        prefix=os.path.basename(dest_path) + ".",
+        suffix=".tmp"
+    )
+    os.close(fd)
+
+    source = sqlite3.connect(settings.db_path)
+    target = sqlite3.connect(tmp_path)
+    copied = False
+    try:
+        journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() == "wal":
+            source.backup(target, pages=-1)
+        else:
+            _paged_backup(source, target)
+        # Copies are opened read-only, which does not work with a WAL file
+        target.execute("PRAGMA journal_mode = DELETE")
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        copied = True
+    finally:
+        target.close()
+        source.close()
+        if not copied:
+            os.remove(tmp_path)
+
+    os.replace(tmp_path, dest_path)
+    return page_count
+
+
+async def backup_database(dest_path: Optional[str] = None) -> Dict[str, Any]:
+    """Create an online backup of the database and return its details"""
+    if dest_path is None:
+        os.makedirs(settings.backup_dir, exist_ok=True)
+        # The random suffix keeps names unique when backups start within the
+        # clock's resolution of each other
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        dest_path = os.path.join(
+            settings.backup_dir, f"database-{timestamp}-{uuid.uuid4().hex[:8]}.db"
+        )
+
+    started = time.perf_counter()
+    pages = await asyncio.to_thread(_copy_database, dest_path)
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info("Backed up %s pages to %s in %.0f ms", pages, dest_path, duration_ms)
+    return {"path": dest_path, "pages": pages, "duration_ms": round(duration_ms, 1)}
+
+
+async def refresh_snapshot() -> Dict[str, Any]:
+    """Replace the read-only snapshot with a fresh copy of the database"""
+    return await backup_database(settings.snapshot_path)
+
+
+async def snapshot_loop(interval_seconds: Optional[float] = None):
+    """Refresh the snapshot forever on a fixed interval"""
+    if interval_seconds is None:
+        interval_seconds = settings.snapshot_refresh_seconds
+    while True:
+        try:
+            await refresh_snapshot()
+        except Exception:
+            # The old snapshot stays in place (e.g. when a reader holds it
+            # open on Windows); try again on the next cycle.
+            logger.exception("Snapshot refresh failed")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    dest = sys.argv[1] if len(sys.argv) > 1 else None
+    print(asyncio.run(backup_database(dest)))
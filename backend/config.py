@@ -0,0 +1,90 @@
+"""
+Application settings.
+
+Values are read once from environment variables and an optional .env file
+in the working directory. Variable names are the upper-case field names,
+e.g. DB_PATH=/var/lib/shop/database.db or BCRYPT_ROUNDS=10.
+"""
+from functools import lru_cache
+from typing import Literal
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Database files
+    db_path: str = "database.db"
+    archive_db_path: str = "archive.db"
+    snapshot_path: str = "database.snapshot.db"
+    # 0 disables the read-only analytics snapshot
+    snapshot_refresh_seconds: float = 0
+
+    # SQLite PRAGMAs. synchronous and cache size default to SQLite's own
+    # defaults; NORMAL trades durability of the last commits on power loss
+    # for faster writes.
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "FULL"
+    sqlite_busy_timeout_ms: int = 5000
+    # Page cache per connection, in KiB
+    sqlite_cache_size_kib: int = 2000
+    # 0 disables memory-mapped I/O
+    sqlite_mmap_size: int = 0
+
+    # Backups
+    backup_dir: str = "backups"
+    backup_pages_per_step: int = 1024
+    backup_step_sleep_seconds: float = 0.01
+    # Paged (rollback-journal) backups give up after this many restarts
+    backup_max_restarts: int = 10
+
+    # Archival and compaction
+    archive_chunk_size: int = 500
+    archive_chunk_pause_seconds: float = 0.05
+    completed_order_retention_days: int = 365
+    incremental_vacuum_pages: int = 2000
+    analysis_limit: int = 400
+    maintenance_interval_seconds: float = 6 * 60 * 60
+
+    # "Frequently bought together" recommendations
+    related_products_top_k: int = 10
+    # Pair updates grow quadratically with basket size and run inside the
+    # checkout transaction, so only this many distinct products per order
+    # are counted
+    related_max_products_per_order: int = 20
+    related_cache_size: int = 1024
+    related_cache_ttl_seconds: float = 300
+
+    # Authentication
+    secret_key: str = "your-secret-key-change-in-production"
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12
+
+    # Server
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    # Maintenance and snapshot refresh run in whichever worker holds the
+    # lock file. Disable them here to run python -m backend.maintenance and
+    # backups from cron or another host instead.
+    run_background_jobs: bool = True
+    background_lock_path: str = "background.lock"
+    # Gzip response compression, off by default. Set a level from 1 to 9 to
+    # enable it; responses smaller than gzip_minimum_size bytes are sent
+    # uncompressed
+    gzip_minimum_size: int = 1000
+    gzip_compress_level: int = 0
+
+    # Database initialization
+    dummyjson_products_url: str = "https://dummyjson.com/products"
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Load settings once per process"""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,22 +1,58 @@
 import aiosqlite
 import os
+import sqlite3
+from pathlib import Path
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
-DB_PATH = "database.db"
+from .config import settings
 
+# Per-connection PRAGMAs, applied in a single round trip on connect
+CONNECTION_PRAGMAS = f"""
+    PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms};
+    PRAGMA synchronous = {settings.sqlite_synchronous};
+    PRAGMA cache_size = -{settings.sqlite_cache_size_kib};
+    PRAGMA mmap_size = {settings.sqlite_mmap_size};
+"""
 
-async def get_db():
-    """Get database connection"""
-    db = await aiosqlite.connect(DB_PATH)
+
+async def _connect(database: str, **kwargs):
+    """Open a connection with row access by name and tuned PRAGMAs"""
+    db = await aiosqlite.connect(database, **kwargs)
     db.row_factory = aiosqlite.Row
+    await db.executescript(CONNECTION_PRAGMAS)
     return db
 
 
+async def get_db():
+    """Get database connection"""
+    return await _connect(settings.db_path)
+
+
+def snapshot_available() -> bool:
+    """Whether reads can be served from the snapshot file"""
+    return settings.snapshot_refresh_seconds > 0 and os.path.exists(settings.snapshot_path)
+
+
+async def get_read_db():
+    """Get a read-only snapshot connection, or the primary if there is none"""
+    if not snapshot_available():
+        return await get_db()
+    uri = Path(settings.snapshot_path).resolve().as_uri() + "?mode=ro"
+    return await _connect(uri, uri=True)
+
+
 async def init_db():
     """Initialize database with all tables"""
     db = await get_db()
-    
+
+    # Incremental auto-vacuum lets the maintenance job return free pages in
+    # small steps. It only takes effect on a fresh database file.
+    await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # WAL lets readers (including online backups) run alongside writers
+    await db.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+
     # Create users table
     await db.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -72,6 +108,35 @@ async def init_db():
             FOREIGN KEY (product_id) REFERENCES products(id)
         )
     """)
+
+    # Order item lookups by order and by product (order history, archival)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id)"
+    )
+
+    # Co-purchase counts for every ordered pair of products bought together
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS product_pairs (
+            product_id INTEGER NOT NULL,
+            related_product_id INTEGER NOT NULL,
+            pair_count INTEGER NOT NULL,
+            PRIMARY KEY (product_id, related_product_id)
+        ) WITHOUT ROWID
+    """)
+
+    # Top-K most frequently co-purchased products per product
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS product_related (
+            product_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            related_product_id INTEGER NOT NULL,
+            pair_count INTEGER NOT NULL,
+            PRIMARY KEY (product_id, position)
+        ) WITHOUT ROWID
+    """)
     
     await db.commit()
     await db.close()
@@ -196,12 +261,136 @@ async def create_order(user_id: int, order_id: str, total_amount: float,
                 item['unit_price']
             )
         )
+
+    # Keep the co-purchase index in step with the new items
+    await update_related_index(db, [item['product_id'] for item in items])
     
     await db.commit()
     await db.close()
     return order_db_id
 
 
+async def _refresh_top_related(db, product_ids: Optional[List[int]] = None):
+    """Recompute the stored top-K related products (all products if None)"""
+    where, params = "", ()
+    if product_ids is not None:
+        where = f"WHERE product_id IN ({','.join('?' * len(product_ids))})"
+        params = tuple(product_ids)
+
+    await db.execute(f"DELETE FROM product_related {where}", params)
+    await db.execute(
+        f"""INSERT INTO product_related (product_id, position, related_product_id, pair_count)
+            SELECT product_id, position, related_product_id, pair_count FROM (
+                SELECT product_id, related_product_id, pair_count,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY product_id
+                           ORDER BY pair_count DESC, related_product_id ASC
+                       ) AS position
+                FROM product_pairs {where}
+            ) WHERE position <= ?""",
+        (*params, settings.related_products_top_k)
+    )
+
+
+async def update_related_index(db, product_ids: List[int]):
+    """Count one co-purchase for every pair of products in an order
+
+    Only the first RELATED_MAX_PRODUCTS_PER_ORDER distinct products are
+    counted, which bounds the pair upserts held under the writer lock.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    unique_ids = list(dict.fromkeys(product_ids))[:settings.related_max_products_per_order]
+    if len(unique_ids) < 2:
+        return
+
+    await db.executemany(
+        """INSERT INTO product_pairs (product_id, related_product_id, pair_count)
+           VALUES (?, ?, 1)
+           ON CONFLICT (product_id, related_product_id)
+           DO UPDATE SET pair_count = pair_count + 1""",
+        [(a, b) for a in unique_ids for b in unique_ids if a != b]
+    )
+    await _refresh_top_related(db, unique_ids)
+
+
+async def rebuild_related_index():
+    """Rebuild the co-purchase index from all order items
+
+    Orders already moved to the archive database are counted as well.
+    """
+    db = await get_db()
+    try:
+        order_items = "SELECT id, order_id, product_id FROM main.order_items"
+        if os.path.exists(settings.archive_db_path):
+            await db.execute("ATTACH DATABASE ? AS archive", (settings.archive_db_path,))
+            # An item copied to the archive but not yet deleted from main
+            # appears twice; grouping by order and product below counts it once
+            order_items += (
+                " UNION ALL SELECT id, order_id, product_id FROM archive.order_items"
+            )
+
+        # Same per-order cap as update_related_index: the first N distinct
+        # products of each order, in item order. An indexed temp table keeps
+        # the self-join linear in the number of orders.
+        await db.execute("DROP TABLE IF EXISTS temp.basket")
+        await db.execute(
+            f"""CREATE TEMP TABLE basket AS
+               SELECT order_id, product_id FROM (
+                   SELECT order_id, product_id,
+                          ROW_NUMBER() OVER (
+                              PARTITION BY order_id ORDER BY MIN(id)
+                          ) AS position
+                   FROM ({order_items})
+                   GROUP BY order_id, product_id
+               ) WHERE position <= ?""",
+            (settings.related_max_products_per_order,)
+        )
+        await db.execute("CREATE INDEX temp.idx_basket_order_id ON basket(order_id)")
+
+        await db.execute("DELETE FROM product_pairs")
+        await db.execute(
+            """INSERT INTO product_pairs (product_id, related_product_id, pair_count)
+               SELECT a.product_id, b.product_id, COUNT(*)
+               FROM temp.basket a
+               INNER JOIN temp.basket b
+                   ON a.order_id = b.order_id AND a.product_id <> b.product_id
+               GROUP BY a.product_id, b.product_id"""
+        )
+        await db.execute("DROP TABLE temp.basket")
+        await _refresh_top_related(db)
+        await db.commit()
+    finally:
+        await db.close()
+
+
+async def get_related_products(product_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Get products most often bought together with a product
+
+    Returns None if the product does not exist.
+    """
+    db = await get_db()
+    cursor = await db.execute(
+        "SELECT 1 FROM products WHERE id = ? AND deleted_at IS NULL",
+        (product_id,)
+    )
+    if await cursor.fetchone() is None:
+        await db.close()
+        return None
+    cursor = await db.execute(
+        """SELECT p.id, p.product_id, p.product_name, p.description, p.price,
+           p.stock_quantity, p.category, p.availability_status, p.created_date,
+           r.pair_count
+           FROM product_related r
+           INNER JOIN products p ON r.related_product_id = p.id
+           WHERE r.product_id = ? AND p.deleted_at IS NULL
+           ORDER BY r.position ASC""",
+        (product_id,)
+    )
+    rows = await cursor.fetchall()
+    await db.close()
+    return [dict(row) for row in rows]
+
+
 async def get_user_orders(user_id: int) -> List[Dict[str, Any]]:
     """Get all orders for a user"""
     db = await get_db()
@@ -221,8 +410,24 @@ async def get_user_orders(user_id: int) -> List[Dict[str, Any]]:
     return [dict(row) for row in rows]
 
 
-async def execute_query(sql: str) -> List[Dict[str, Any]]:
-    """Execute a SQL query and return results (admin only)"""
+async def execute_query(sql: str, use_snapshot: bool = False) -> List[Dict[str, Any]]:
+    """Execute a SQL query and return results (admin only)
+
+    With use_snapshot, the query runs against the read-only snapshot when one
+    is available; statements that try to write fall back to the primary.
+    """
+    if use_snapshot and snapshot_available():
+        db = await get_read_db()
+        try:
+            cursor = await db.execute(sql)
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+        except sqlite3.OperationalError as e:
+            if "readonly" not in str(e):
+                raise
+        finally:
+            await db.close()
+
     db = await get_db()
     try:
         cursor = await db.execute(sql)
@@ -3,17 +3,18 @@ import httpx
 import sys
 import os
 
-# Add parent directory to path for standalone execution
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Add project root to path for standalone execution
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import init_db, create_user, insert_product, get_db
-from auth import get_password_hash
+from backend.config import settings
+from backend.database import init_db, create_user, insert_product, get_db, rebuild_related_index
+from backend.auth import get_password_hash
 
 
 async def fetch_products_from_dummyjson():
     """Fetch products from dummyjson.com API"""
     async with httpx.AsyncClient() as client:
-        response = await client.get("https://dummyjson.com/products")
+        response = await client.get(settings.dummyjson_products_url)
         if response.status_code == 200:
             data = response.json()
             return data.get('products', [])
@@ -56,6 +57,10 @@ async def initialize_database():
         print(f"[OK] Inserted {inserted_count} products into database")
     else:
         print("[WARNING] No products fetched from dummyjson.com")
+
+    # Build the "frequently bought together" index from any existing orders
+    await rebuild_related_index()
+    print("[OK] Related products index built")
     
     print("\nDatabase initialization complete!")
     print("You can now start the backend server with: uvicorn backend.main:app --reload")
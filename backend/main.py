@@ -1,7 +1,10 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import timedelta
+import asyncio
+import sqlite3
 import uuid
 from typing import Optional
 
@@ -10,11 +13,15 @@ from .database import (
     get_all_products, get_product_by_id, create_order, get_user_orders,
     execute_query
 )
-from .auth import verify_password, get_password_hash, create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from .auth import verify_password, get_password_hash, create_access_token, verify_token
+from .config import settings
+from .backup import backup_database, snapshot_loop
+from .maintenance import maintenance_loop
 from .models import (
     UserRegister, UserLogin, UserResponse, Token,
-    ProductResponse, OrderCreate, OrderResponse, SQLQuery
+    ProductResponse, RelatedProductResponse, OrderCreate, OrderResponse, SQLQuery
 )
+from .recommendations import get_related, invalidate_related
 
 app = FastAPI(title="E-Commerce API", version="1.0.0")
 
@@ -27,9 +34,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression
+if settings.gzip_compress_level > 0:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.gzip_minimum_size,
+        compresslevel=settings.gzip_compress_level,
+    )
+
 # Security scheme
 security = HTTPBearer()
 
+# Background tasks (archival and compaction, read snapshot refresh)
+background_tasks: list[asyncio.Task] = []
+
+# Held by the one server process that runs startup work and background jobs
+background_lock: Optional[sqlite3.Connection] = None
+
+
+def acquire_background_lock() -> Optional[sqlite3.Connection]:
+    """Try to become the process that runs background jobs
+
+    Holds an exclusive SQLite lock on the lock file for the life of the
+    process. With several uvicorn workers only the first one gets it, and
+    the operating system releases it if that worker dies.
+    """
+    conn = sqlite3.connect(
+        settings.background_lock_path,
+        timeout=0,
+        isolation_level=None,
+        check_same_thread=False
+    )
+    try:
+        conn.execute("BEGIN EXCLUSIVE")
+    except sqlite3.OperationalError:
+        conn.close()
+        return None
+    return conn
+
+
+@app.on_event("startup")
+async def startup():
+    """Ensure the schema is current and start background tasks (one worker only)"""
+    global background_lock
+    background_lock = acquire_background_lock()
+    if background_lock is None:
+        return
+
+    await init_db()
+    if not settings.run_background_jobs:
+        return
+    background_tasks.append(asyncio.create_task(maintenance_loop()))
+    if settings.snapshot_refresh_seconds > 0:
+        background_tasks.append(asyncio.create_task(snapshot_loop()))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background tasks and release the background lock"""
+    for task in background_tasks:
+        task.cancel()
+    if background_lock is not None:
+        background_lock.close()
+
 
 async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
     """Get current user ID from JWT token"""
@@ -44,6 +111,17 @@ async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depend
     return int(user_id)
 
 
+async def get_admin_user_id(user_id: int = Depends(get_current_user_id)) -> int:
+    """Get current user ID, requiring the admin user"""
+    user = await get_user_by_id(user_id)
+    if not user or user["username"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return user_id
+
+
 # Routes
 @app.get("/")
 async def root():
@@ -92,7 +170,7 @@ async def login(credentials: UserLogin):
         )
     
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": str(user["id"])},
         expires_delta=access_token_expires
@@ -120,6 +198,18 @@ async def get_product(product_id: int):
     return ProductResponse(**product)
 
 
+@app.get("/api/products/{product_id}/related", response_model=list[RelatedProductResponse])
+async def get_related_products_endpoint(product_id: int):
+    """Get products frequently bought together with a product"""
+    related = await get_related(product_id)
+    if related is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return [RelatedProductResponse(**item) for item in related]
+
+
 @app.post("/api/orders", response_model=dict)
 async def create_order_endpoint(
     order_data: OrderCreate,
@@ -137,6 +227,7 @@ async def create_order_endpoint(
         total_amount=order_data.total_amount,
         items=[item.dict() for item in order_data.items]
     )
+    invalidate_related(item.product_id for item in order_data.items)
     
     return {
         "order_id": order_id,
@@ -189,7 +280,7 @@ async def execute_sql_query(
         )
     
     try:
-        results = await execute_query(query_data.query)
+        results = await execute_query(query_data.query, use_snapshot=query_data.use_snapshot)
         return {"results": results, "row_count": len(results)}
     except Exception as e:
         raise HTTPException(
@@ -198,7 +289,24 @@ async def execute_sql_query(
         )
 
 
+@app.post("/api/admin/backup")
+async def create_backup(user_id: int = Depends(get_admin_user_id)):
+    """Create an online backup of the database (admin only)"""
+    try:
+        return await backup_database()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Backup error: {str(e)}"
+        )
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "backend.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+    )
 
@@ -0,0 +1,290 @@
+"""
+Background maintenance: archive dead rows and compact the database.
+
+Soft-deleted orders, old completed orders (with their order items) and
+soft-deleted products that no live order still references are moved into a
+separate archive database file. Rows are moved in small chunks: each chunk
+is copied into the archive and committed, then deleted from the main
+database in its own short transaction. The main database's writer lock is
+only held for the delete, and checkout requests can interleave between
+chunks.
+
+Run once from the project root with: python -m backend.maintenance
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .database import get_db
+
+logger = logging.getLogger(__name__)
+
+ORDER_COLUMNS = "id, order_id, user_id, total_amount, order_status, order_date, deleted_at"
+ORDER_ITEM_COLUMNS = "id, order_item_id, order_id, product_id, quantity, unit_price"
+PRODUCT_COLUMNS = (
+    "id, product_id, product_name, description, price, stock_quantity, "
+    "category, availability_status, created_date, deleted_at"
+)
+
+
+async def _attach_archive(db):
+    """Attach the archive database and make sure its tables exist"""
+    await db.execute("ATTACH DATABASE ? AS archive", (settings.archive_db_path,))
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS archive.orders (
+            id INTEGER PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            order_status TEXT,
+            order_date TIMESTAMP,
+            deleted_at TIMESTAMP NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS archive.order_items (
+            id INTEGER PRIMARY KEY,
+            order_item_id TEXT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS archive.products (
+            id INTEGER PRIMARY KEY,
+            product_id INTEGER,
+            product_name TEXT NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            stock_quantity INTEGER NOT NULL,
+            category TEXT,
+            availability_status TEXT,
+            created_date TIMESTAMP,
+            deleted_at TIMESTAMP NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS archive.idx_archive_order_items_order_id "
+        "ON order_items(order_id)"
+    )
+    await db.commit()
+
+
+# Rows eligible for archival. Re-checked when deleting, in case a row
+# changed between the copy and delete steps.
+ARCHIVABLE_ORDER = """
+    (deleted_at IS NOT NULL
+     OR (order_status = 'completed' AND order_date < datetime('now', :retention)))
+"""
+ARCHIVABLE_PRODUCT = """
+    (deleted_at IS NOT NULL
+     AND NOT EXISTS (
+         SELECT 1 FROM main.order_items oi WHERE oi.product_id = main.products.id
+     ))
+"""
+
+
+def _id_params(ids: List[int]) -> Tuple[str, Dict[str, Any]]:
+    """Named placeholders and parameters for an id list"""
+    names = [f"id{i}" for i in range(len(ids))]
+    return ",".join(f":{name}" for name in names), dict(zip(names, ids))
+
+
+async def _archive_orders_chunk(db, after_id: int) -> Tuple[int, int]:
+    """Move one chunk of archivable orders. Returns (rows moved, last id seen)
+
+    A transaction spanning main and the attached archive is not atomic
+    across a crash in WAL mode, so rows are first copied into the archive
+    and committed, then deleted from main in a second transaction. The copy
+    uses INSERT OR REPLACE, so repeating it after a crash is harmless.
+    """
+    retention = f"-{settings.completed_order_retention_days} days"
+
+    # Step 1: copy into the archive. A deferred transaction only takes the
+    # write lock on archive.db, so checkout writes to main are not blocked.
+    await db.execute("BEGIN")
+    cursor = await db.execute(
+        f"""SELECT id FROM main.orders
+            WHERE id > :after_id AND {ARCHIVABLE_ORDER}
+            ORDER BY id ASC
+            LIMIT :limit""",
+        {"after_id": after_id, "retention": retention, "limit": settings.archive_chunk_size}
+    )
+    ids = [row[0] for row in await cursor.fetchall()]
+    if not ids:
+        await db.commit()
+        return 0, after_id
+
+    placeholders, params = _id_params(ids)
+    await db.execute(
+        f"""INSERT OR REPLACE INTO archive.orders ({ORDER_COLUMNS})
+            SELECT {ORDER_COLUMNS} FROM main.orders WHERE id IN ({placeholders})""",
+        params
+    )
+    await db.execute(
+        f"""INSERT OR REPLACE INTO archive.order_items ({ORDER_ITEM_COLUMNS})
+            SELECT {ORDER_ITEM_COLUMNS} FROM main.order_items WHERE order_id IN ({placeholders})""",
+        params
+    )
+    await db.commit()
+
+    # Step 2: delete the archived rows from main in a short write transaction
+    await db.execute("BEGIN IMMEDIATE")
+    await db.execute(
+        f"""DELETE FROM main.order_items WHERE order_id IN (
+                SELECT id FROM main.orders
+                WHERE id IN ({placeholders}) AND {ARCHIVABLE_ORDER}
+            )""",
+        {**params, "retention": retention}
+    )
+    await db.execute(
+        f"DELETE FROM main.orders WHERE id IN ({placeholders}) AND {ARCHIVABLE_ORDER}",
+        {**params, "retention": retention}
+    )
+    await db.commit()
+    return len(ids), ids[-1]
+
+
+async def _archive_products_chunk(db, after_id: int) -> Tuple[int, int]:
+    """Move one chunk of soft-deleted, unreferenced products
+
+    Copies and deletes in separate transactions, as _archive_orders_chunk does.
+    """
+    await db.execute("BEGIN")
+    cursor = await db.execute(
+        f"""SELECT id FROM main.products
+            WHERE id > :after_id AND {ARCHIVABLE_PRODUCT}
+            ORDER BY id ASC
+            LIMIT :limit""",
+        {"after_id": after_id, "limit": settings.archive_chunk_size}
+    )
+    ids = [row[0] for row in await cursor.fetchall()]
+    if not ids:
+        await db.commit()
+        return 0, after_id
+
+    placeholders, params = _id_params(ids)
+    await db.execute(
+        f"""INSERT OR REPLACE INTO archive.products ({PRODUCT_COLUMNS})
+            SELECT {PRODUCT_COLUMNS} FROM main.products WHERE id IN ({placeholders})""",
+        params
+    )
+    await db.commit()
+
+    await db.execute("BEGIN IMMEDIATE")
+    await db.execute(
+        f"DELETE FROM main.products WHERE id IN ({placeholders}) AND {ARCHIVABLE_PRODUCT}",
+        params
+    )
+    await db.commit()
+    return len(ids), ids[-1]
+
+
+async def _archive_in_chunks(chunk_fn) -> int:
+    """Run a chunk function until it reports nothing left to move"""
+    db = await get_db()
+    total = 0
+    try:
+        await _attach_archive(db)
+        last_id = 0
+        while True:
+            moved, last_id = await chunk_fn(db, last_id)
+            if not moved:
+                break
+            total += moved
+            # Yield the write lock to other connections between chunks
+            await asyncio.sleep(settings.archive_chunk_pause_seconds)
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+    return total
+
+
+async def archive_orders() -> int:
+    """Archive soft-deleted and old completed orders with their items"""
+    return await _archive_in_chunks(_archive_orders_chunk)
+
+
+async def archive_products() -> int:
+    """Archive soft-deleted products that no remaining order item references"""
+    return await _archive_in_chunks(_archive_products_chunk)
+
+
+async def _freelist_count(db) -> int:
+    """Number of unused pages in the main database file"""
+    cursor = await db.execute("PRAGMA freelist_count")
+    return (await cursor.fetchone())[0]
+
+
+async def compact_database() -> Dict[str, Any]:
+    """Release free pages and refresh query planner statistics"""
+    db = await get_db()
+    try:
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        auto_vacuum = (await cursor.fetchone())[0]
+        free_pages = await _freelist_count(db)
+
+        pages_freed = 0
+        # 2 = INCREMENTAL. Databases created before auto_vacuum was enabled
+        # need a one-off offline VACUUM to switch modes.
+        if auto_vacuum == 2 and free_pages:
+            # The pragma frees one page per step, and execute() only steps it
+            # once; executescript() runs it to completion.
+            await db.executescript(
+                f"PRAGMA incremental_vacuum({settings.incremental_vacuum_pages});"
+            )
+            pages_freed = free_pages - await _freelist_count(db)
+        elif auto_vacuum != 2:
+            logger.info("auto_vacuum is not INCREMENTAL; skipping incremental vacuum")
+
+        # PRAGMA optimize on a fresh connection skips tables that have never
+        # been analyzed, so run ANALYZE directly. analysis_limit bounds how
+        # many rows it samples per index, keeping it fast on large tables.
+        await db.execute(f"PRAGMA analysis_limit = {settings.analysis_limit}")
+        await db.execute("ANALYZE")
+        await db.commit()
+    finally:
+        await db.close()
+    return {"free_pages": free_pages, "pages_freed": pages_freed}
+
+
+async def run_maintenance() -> Dict[str, Any]:
+    """Run one full archival and compaction pass"""
+    orders_archived = await archive_orders()
+    products_archived = await archive_products()
+    compaction = await compact_database()
+    result = {
+        "orders_archived": orders_archived,
+        "products_archived": products_archived,
+        **compaction,
+    }
+    logger.info("Maintenance complete: %s", result)
+    return result
+
+
+async def maintenance_loop(interval_seconds: Optional[float] = None):
+    """Run maintenance forever on a fixed interval"""
+    if interval_seconds is None:
+        interval_seconds = settings.maintenance_interval_seconds
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_maintenance()
+        except Exception:
+            logger.exception("Database maintenance failed")
+
+
+if __name__ == "__main__":
+    print(asyncio.run(run_maintenance()))
@@ -40,6 +40,10 @@ class ProductResponse(BaseModel):
     created_date: Optional[datetime]
 
 
+class RelatedProductResponse(ProductResponse):
+    pair_count: int
+
+
 # Order Models
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -73,4 +77,6 @@ class OrderResponse(BaseModel):
 # SQL Query Model
 class SQLQuery(BaseModel):
     query: str
+    # Read from the analytics snapshot when one is configured
+    use_snapshot: bool = True
 
@@ -0,0 +1,91 @@
+"""
+"Frequently bought together" lookups served from an in-memory LRU.
+
+The co-purchase index itself lives in the database (see
+update_related_index in database.py) and is updated in the same
+transaction as each order. This module caches the per-product top-K lists
+so repeated catalog page views do not hit SQLite.
+
+Rebuild the index from existing orders with: python -m backend.recommendations
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+from .database import get_related_products, rebuild_related_index
+
+
+class LRUCache:
+    """Least-recently-used cache with a per-entry time to live"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable):
+        """Drop the given keys"""
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+
+
+related_cache = LRUCache(settings.related_cache_size, settings.related_cache_ttl_seconds)
+
+# Cached in place of a list for products that do not exist, so repeated
+# requests for them are answered without touching SQLite either
+PRODUCT_NOT_FOUND = object()
+
+
+async def get_related(product_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Get products frequently bought together with a product
+
+    Returns None if the product does not exist.
+    """
+    related = related_cache.get(product_id)
+    if related is None:
+        related = await get_related_products(product_id)
+        if related is None:
+            related = PRODUCT_NOT_FOUND
+        related_cache.set(product_id, related)
+    if related is PRODUCT_NOT_FOUND:
+        return None
+    return related
+
+
+def invalidate_related(product_ids: Iterable[int]):
+    """Forget cached lists for products whose co-purchase counts changed
+
+    Only products in the same order gain new pairs, so their lists are the
+    only ones that can change. Other server workers catch up within the TTL.
+    """
+    related_cache.invalidate(product_ids)
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_related_index())
+    print("Related products index rebuilt")
@@ -0,0 +1,195 @@
+"""
+Benchmark for the "frequently bought together" index.
+
+Builds a synthetic order history in a temporary database, then measures:
+- the full index rebuild from order_items
+- the per-order cost of update_related_index (plus commit), for typical
+  baskets and for very large ones
+- end-to-end create_order latency
+- related-products lookup latency, uncached (SQLite) and cached (LRU)
+- GET /api/products/{id}/related end to end (in-process ASGI, cached)
+
+Usage (from the project root):
+    python benchmarks/bench_related.py [--order-items 1000000] [--products 1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def percentiles(samples_ms):
+    """Format p50/p95/p99 for a list of millisecond timings"""
+    ordered = sorted(samples_ms)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return (f"mean {statistics.mean(ordered):.3f} ms, p50 {pick(0.50):.3f} ms, "
+            f"p95 {pick(0.95):.3f} ms, p99 {pick(0.99):.3f} ms")
+
+
+def random_basket(rng, product_weights, product_count, max_items):
+    """Pick a basket of distinct products, skewed towards popular ones"""
+    size = rng.randint(1, max_items)
+    basket = set(rng.choices(range(1, product_count + 1), weights=product_weights, k=size))
+    return sorted(basket)
+
+
+def generate_history(db_path, rng, order_items, product_count, max_items):
+    """Bulk-insert products, one user and orders totalling order_items rows"""
+    product_weights = [1 / rank for rank in range(1, product_count + 1)]
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('bench', 'bench@example.com', 'x')")
+    conn.executemany(
+        "INSERT INTO products (product_name, price, stock_quantity) VALUES (?, 9.99, 100)",
+        [(f"Product {i}",) for i in range(1, product_count + 1)]
+    )
+
+    written = 0
+    order_rows, item_rows = [], []
+    order_db_id = 0
+    while written < order_items:
+        order_db_id += 1
+        basket = random_basket(rng, product_weights, product_count, max_items)
+        basket = basket[:order_items - written]
+        order_rows.append((order_db_id, f"BENCH-{order_db_id}", 1, 9.99 * len(basket)))
+        item_rows.extend((order_db_id, product_id, 1, 9.99) for product_id in basket)
+        written += len(basket)
+        if len(item_rows) >= 50000:
+            _flush(conn, order_rows, item_rows)
+    _flush(conn, order_rows, item_rows)
+    conn.commit()
+    conn.close()
+    return order_db_id, product_weights
+
+
+def _flush(conn, order_rows, item_rows):
+    conn.executemany(
+        "INSERT INTO orders (id, order_id, user_id, total_amount) VALUES (?, ?, ?, ?)",
+        order_rows
+    )
+    conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+        item_rows
+    )
+    order_rows.clear()
+    item_rows.clear()
+
+
+async def run(args):
+    from backend import database
+    from backend.recommendations import get_related, related_cache
+
+    rng = random.Random(args.seed)
+    await database.init_db()
+
+    started = time.perf_counter()
+    order_count, product_weights = generate_history(
+        database.settings.db_path, rng, args.order_items, args.products, args.max_items
+    )
+    print(f"Generated {args.order_items:,} order items in {order_count:,} orders "
+          f"over {args.products:,} products ({time.perf_counter() - started:.1f} s)")
+
+    started = time.perf_counter()
+    await database.rebuild_related_index()
+    print(f"Full index rebuild: {time.perf_counter() - started:.1f} s")
+
+    baskets = [random_basket(rng, product_weights, args.products, args.max_items)
+               for _ in range(args.samples)]
+
+    # Index maintenance only, as create_order runs it, committed per order
+    update_ms = []
+    db = await database.get_db()
+    for basket in baskets:
+        started = time.perf_counter()
+        await database.update_related_index(db, basket)
+        await db.commit()
+        update_ms.append((time.perf_counter() - started) * 1000)
+    await db.close()
+    print(f"update_related_index per order ({args.samples} orders): {percentiles(update_ms)}")
+
+    # Oversized baskets are capped at RELATED_MAX_PRODUCTS_PER_ORDER products
+    large_ms = []
+    db = await database.get_db()
+    for _ in range(args.large_samples):
+        basket = rng.sample(range(1, args.products + 1), min(args.large_basket, args.products))
+        started = time.perf_counter()
+        await database.update_related_index(db, basket)
+        await db.commit()
+        large_ms.append((time.perf_counter() - started) * 1000)
+    await db.close()
+    print(f"update_related_index, {args.large_basket}-product baskets "
+          f"(capped at {database.settings.related_max_products_per_order}, "
+          f"{args.large_samples} orders): {percentiles(large_ms)}")
+
+    create_ms = []
+    for i, basket in enumerate(baskets):
+        items = [{"product_id": p, "quantity": 1, "unit_price": 9.99} for p in basket]
+        started = time.perf_counter()
+        await database.create_order(1, f"BENCH-NEW-{i}", 9.99 * len(items), items)
+        create_ms.append((time.perf_counter() - started) * 1000)
+    print(f"create_order end to end ({args.samples} orders): {percentiles(create_ms)}")
+
+    lookup_ids = [rng.randint(1, args.products) for _ in range(args.samples)]
+    uncached_ms = []
+    for product_id in lookup_ids:
+        related_cache.clear()
+        started = time.perf_counter()
+        await get_related(product_id)
+        uncached_ms.append((time.perf_counter() - started) * 1000)
+    print(f"Related lookup, uncached: {percentiles(uncached_ms)}")
+
+    for product_id in lookup_ids:
+        await get_related(product_id)
+    cached_ms = []
+    for product_id in lookup_ids:
+        started = time.perf_counter()
+        await get_related(product_id)
+        cached_ms.append((time.perf_counter() - started) * 1000)
+    print(f"Related lookup, cached:   {percentiles(cached_ms)}")
+
+    # Through routing, validation and serialization, without a network hop.
+    # ASGITransport does not send lifespan events, so no background jobs start.
+    from backend.main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for product_id in lookup_ids:
+            await client.get(f"/api/products/{product_id}/related")
+        endpoint_ms = []
+        for product_id in lookup_ids:
+            started = time.perf_counter()
+            response = await client.get(f"/api/products/{product_id}/related")
+            endpoint_ms.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+    print(f"GET /api/products/{{id}}/related, cached: {percentiles(endpoint_ms)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--order-items", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--max-items", type=int, default=7,
+                        help="largest basket size; sizes are uniform from 1")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--large-basket", type=int, default=500,
+                        help="basket size for the large-order case")
+    parser.add_argument("--large-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Settings are read once on import, so point them at the scratch
+        # database before anything from backend is loaded.
+        os.environ["DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+        os.environ["RELATED_CACHE_SIZE"] = str(args.products)
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ a = Analysis(
         'starlette',
         'pydantic',
         'pydantic_core',
+        'pydantic_settings',
         'httpx',
         'httpcore',
         'aiosqlite',